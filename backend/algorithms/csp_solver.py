@@ -1,7 +1,7 @@
 """
 Enhanced CSP Solver with Arc Consistency (AC-3) and detailed step tracking
 """
-import copy
+from collections import deque
 
 class CSPSolver:
     def __init__(self, domains, constraints):
@@ -10,10 +10,34 @@ class CSPSolver:
         domains: dict of {variable: [possible_values]}
         constraints: list of (category, value, action_type) tuples
         """
-        self.domains = copy.deepcopy(domains)
+        # Each domain is a bitmask over self.values[variable]
+        self.values = {}
+        self.value_index = {}
+        self.masks = {}
+        for var, values in domains.items():
+            self.values[var] = list(values)
+            self.value_index[var] = {v: i for i, v in enumerate(values)}
+            self.masks[var] = (1 << len(values)) - 1
         self.constraints = constraints
         self.steps = []
     
+    @property
+    def domains(self):
+        """Current domains as {variable: [possible_values]}"""
+        return {
+            var: [v for i, v in enumerate(self.values[var]) if mask >> i & 1]
+            for var, mask in self.masks.items()
+        }
+    
+    def _bit(self, var, value):
+        """Bit for value in var's domain, registering values not seen yet"""
+        i = self.value_index[var].get(value)
+        if i is None:
+            i = len(self.values[var])
+            self.values[var].append(value)
+            self.value_index[var][value] = i
+        return 1 << i
+    
     def solve(self):
         """
         Solve CSP using constraint propagation
@@ -24,51 +48,64 @@ class CSPSolver:
         # Apply explicit constraints first
         for category, value, action_type in self.constraints:
             if action_type == 'eliminate':
-                if value in self.domains[category]:
-                    self.domains[category].remove(value)
+                bit = self._bit(category, value)
+                if self.masks[category] & bit:
+                    self.masks[category] &= ~bit
                     self.steps.append({
                         'step': 'Elimination',
                         'message': f"Eliminated {value} from {category}",
                         'type': 'elimination'
                     })
             elif action_type == 'confirm':
-                if len(self.domains[category]) > 1:
-                    self.domains[category] = [value]
+                if self.masks[category].bit_count() > 1:
+                    self.masks[category] = self._bit(category, value)
                     self.steps.append({
                         'step': 'Confirmation',
                         'message': f"Confirmed {value} as {category}",
                         'type': 'confirmation'
                     })
         
-        # Apply arc consistency
-        changed = True
-        iterations = 0
-        max_iterations = 10
+        # Apply arc consistency (AC-3 style worklist of arcs)
+        queue = deque(
+            (var1, var2)
+            for var1 in self.masks
+            for var2 in self.masks
+            if var1 != var2
+        )
+        in_queue = set(queue)
         
-        while changed and iterations < max_iterations:
-            changed = False
-            iterations += 1
+        while queue:
+            arc = queue.popleft()
+            in_queue.discard(arc)
+            var1, var2 = arc
+            
+            mask1 = self.masks[var1]
+            mask2 = self.masks[var2]
+            if mask1.bit_count() != 1:
+                continue
             
-            # Check for singleton domains and propagate
-            for var1, values1 in self.domains.items():
-                if len(values1) == 1:
-                    # This variable is assigned, check others
-                    assigned_value = values1[0]
-                    
-                    for var2, values2 in self.domains.items():
-                        if var1 != var2 and assigned_value in values2 and len(values2) > 1:
-                            # Remove this value from other domain
-                            self.domains[var2].remove(assigned_value)
-                            changed = True
-                            self.steps.append({
-                                'step': 'Arc Consistency',
-                                'message': f"Removed {assigned_value} from {var2} (already assigned to {var1})",
-                                'type': 'elimination'
-                            })
+            # var1 is assigned, so its value can't appear in var2
+            assigned_value = self.values[var1][mask1.bit_length() - 1]
+            i = self.value_index[var2].get(assigned_value)
+            if i is not None and mask2 >> i & 1 and mask2.bit_count() > 1:
+                mask2 &= ~(1 << i)
+                self.masks[var2] = mask2
+                self.steps.append({
+                    'step': 'Arc Consistency',
+                    'message': f"Removed {assigned_value} from {var2} (already assigned to {var1})",
+                    'type': 'elimination'
+                })
+                
+                # var2 may now be assigned too, so revisit its outgoing arcs
+                if mask2.bit_count() == 1:
+                    for var3 in self.masks:
+                        if var3 != var2 and (var2, var3) not in in_queue:
+                            queue.append((var2, var3))
+                            in_queue.add((var2, var3))
         
         # Check for empty domains
-        for var, values in self.domains.items():
-            if len(values) == 0:
+        for var, mask in self.masks.items():
+            if mask == 0:
                 self.steps.append({
                     'step': 'Inconsistency',
                     'message': f"Domain of {var} is empty - no solution possible",
@@ -84,11 +121,11 @@ class CSPSolver:
     
     def is_solved(self):
         """Check if all variables are assigned"""
-        return all(len(values) == 1 for values in self.domains.values())
+        return all(mask.bit_count() == 1 for mask in self.masks.values())
     
     def count_solutions(self):
         """Count number of possible solutions"""
         count = 1
-        for values in self.domains.values():
-            count *= len(values)
+        for mask in self.masks.values():
+            count *= mask.bit_count()
         return count
\ No newline at end of file
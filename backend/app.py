@@ -2,12 +2,56 @@
 Main Flask application
 """
 
+import orjson
 from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from routes.game import game_bp
 from routes.ai import ai_bp
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson instead of the json module"""
+    
+    def _options(self, sort_keys, indent):
+        # Let datetimes reach default() so they keep Flask's HTTP date format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        # orjson output is always compact between items and UTF-8, so these
+        # don't change anything it could honour
+        kwargs.pop('separators', None)
+        kwargs.pop('ensure_ascii', None)
+        default = kwargs.pop('default', self.default)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        indent = kwargs.pop('indent', None)
+        if kwargs or indent not in (None, 2):
+            # Anything orjson can't express goes through the json module
+            if indent is not None:
+                kwargs['indent'] = indent
+            return super().dumps(obj, default=default, sort_keys=sort_keys, **kwargs)
+        return orjson.dumps(obj, default=default, option=self._options(sort_keys, indent)).decode()
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            # e.g. the session serializer's object_hook
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Encode straight to bytes rather than round-tripping through str
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._options(self.sort_keys, indent) | orjson.OPT_APPEND_NEWLINE
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 # Register blueprints
@@ -0,0 +1,52 @@
+"""
+Bounded, thread-safe storage for per-session state
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class SessionStore:
+    def __init__(self, maxsize=10000, ttl=3600):
+        """
+        Initialize session store
+        maxsize: most sessions kept; the least recently used is evicted first
+        ttl: seconds a session may sit idle before it is dropped
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # session_id -> (last_access, value), least recently used first
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def _evict(self, now):
+        """Drop idle sessions, then the oldest ones beyond maxsize"""
+        while self._data:
+            last_access, _ = next(iter(self._data.values()))
+            if now - last_access < self.ttl and len(self._data) <= self.maxsize:
+                break
+            self._data.popitem(last=False)
+    
+    def get(self, session_id, default=None):
+        """Return the session's value and mark it as recently used"""
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            entry = self._data.get(session_id)
+            if entry is None:
+                return default
+            self._data[session_id] = (now, entry[1])
+            self._data.move_to_end(session_id)
+            return entry[1]
+    
+    def pop(self, session_id, default=None):
+        """Remove a session and return its value"""
+        with self._lock:
+            entry = self._data.pop(session_id, None)
+            return default if entry is None else entry[1]
+    
+    def __setitem__(self, session_id, value):
+        with self._lock:
+            now = time.monotonic()
+            self._data[session_id] = (now, value)
+            self._data.move_to_end(session_id)
+            self._evict(now)
\ No newline at end of file
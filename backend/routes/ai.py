@@ -1,31 +1,22 @@
 from flask import Blueprint, request, jsonify
 import copy
+from collections import deque
 from algorithms.csp_solver import CSPSolver
+from models.session_store import SessionStore
+from routes.game import get_game_state, get_available_actions, apply_action
 
 ai_bp = Blueprint('ai', __name__)
 
-# Store AI state per session
-ai_sessions = {}
-
-# Forward declaration - will be imported after game module loads
-game_sessions = None
-get_game_state = None
-apply_action = None
-
-def init_game_imports():
-    """Initialize imports from game module to avoid circular imports"""
-    global game_sessions, get_game_state, apply_action
-    if game_sessions is None:
-        from routes.game import game_sessions as gs, get_game_state as ggs, apply_action as aa
-        game_sessions = gs
-        get_game_state = ggs
-        apply_action = aa
+# Store AI state per session (idle sessions expire after an hour)
+ai_sessions = SessionStore(maxsize=10000, ttl=3600)
 
 class AIDetective:
     """AI Detective using A* search and CSP"""
     
+    # Only the most recent algorithm steps are kept for display
+    MAX_ALGORITHM_STEPS = 50
+    
     def __init__(self, session_id):
-        init_game_imports()
         self.session_id = session_id
         game_state = get_game_state(session_id)
         if not game_state:
@@ -33,46 +24,33 @@ class AIDetective:
         self.domains = copy.deepcopy(game_state['current_domains'])
         self.total_cost = 0
         self.actions_taken = 0
-        self.algorithm_steps = []
+        self.algorithm_steps = deque(maxlen=self.MAX_ALGORITHM_STEPS)
         
     def get_best_action(self):
         """Use A* search to find best action"""
-        init_game_imports()
         game_state = get_game_state(self.session_id)
         if not game_state:
             return None, "Game state not found", []
             
-        available_actions = game_state.get('available_actions', [])
+        available_actions = get_available_actions(game_state)
         
         if not available_actions:
             return None, "No actions available", []
         
-        evaluations = []
-        best_action = None
-        best_f_score = float('inf')
+        best_index, f_scores, h_cost = self._score_actions(available_actions)
+        best_action = available_actions[best_index]
+        best_f_score = f_scores[best_index]
         
-        for action in available_actions:
-            # g(n): actual cost
-            g_cost = self.total_cost + action['cost']
-            
-            # h(n): heuristic (possible solutions remaining)
-            h_cost = self._calculate_heuristic()
-            
-            # f(n) = g(n) + h(n)
-            f_cost = g_cost + h_cost
-            
-            evaluations.append({
+        evaluations = [
+            {
                 'action': action['action'],
                 'action_id': action['id'],
-                'g_cost': g_cost,
+                'g_cost': self.total_cost + action['cost'],
                 'h_cost': h_cost,
                 'f_cost': f_cost
-            })
-            
-            if f_cost < best_f_score:
-                best_f_score = f_cost
-                best_action = action
-        
+            }
+            for action, f_cost in zip(available_actions, f_scores)
+        ]
         evaluations.sort(key=lambda x: x['f_cost'])
         
         explanation = f"Selected '{best_action['action']}' using A* algorithm (F-score: {best_f_score:.1f})"
@@ -86,9 +64,33 @@ class AIDetective:
         
         return best_action, explanation, evaluations
     
+    def _score_actions(self, available_actions):
+        """
+        Score actions with f(n) = g(n) + h(n) and pick the lowest
+        Returns: (best_index, f_scores, h_cost)
+        """
+        # h(n): heuristic (possible solutions remaining), shared by all actions
+        h_cost = self._calculate_heuristic()
+        
+        # g(n): actual cost so far plus the action's cost
+        f_scores = [self.total_cost + action['cost'] + h_cost for action in available_actions]
+        best_index = min(range(len(f_scores)), key=f_scores.__getitem__)
+        return best_index, f_scores, h_cost
+    
+    def peek_best_action(self):
+        """Best next action by f-score, without recording a search step"""
+        game_state = get_game_state(self.session_id)
+        if not game_state:
+            return None
+        
+        available_actions = get_available_actions(game_state)
+        if not available_actions:
+            return None
+        best_index, _, _ = self._score_actions(available_actions)
+        return available_actions[best_index]
+    
     def _calculate_heuristic(self):
         """Calculate heuristic based on domain sizes"""
-        init_game_imports()
         game_state = get_game_state(self.session_id)
         if not game_state:
             return 100
@@ -105,7 +107,6 @@ class AIDetective:
     
     def update_state(self, evidence, csp_result):
         """Update AI state after taking action"""
-        init_game_imports()
         game_state = get_game_state(self.session_id)
         if game_state:
             self.domains = copy.deepcopy(game_state['current_domains'])
@@ -131,7 +132,6 @@ class AIDetective:
     
     def get_confidence(self):
         """Calculate confidence level"""
-        init_game_imports()
         game_state = get_game_state(self.session_id)
         if not game_state:
             return 0.0
@@ -142,7 +142,6 @@ class AIDetective:
 def make_ai_move():
     """AI makes one move"""
     try:
-        init_game_imports()
         data = request.json
         session_id = data.get('session_id')
         
@@ -160,16 +159,16 @@ def make_ai_move():
             }), 404
         
         # Initialize or get AI detective
-        if session_id not in ai_sessions:
+        ai_detective = ai_sessions.get(session_id)
+        if ai_detective is None:
             try:
-                ai_sessions[session_id] = AIDetective(session_id)
+                ai_detective = AIDetective(session_id)
             except ValueError as e:
                 return jsonify({
                     'success': False,
                     'message': str(e)
                 }), 400
-        
-        ai_detective = ai_sessions[session_id]
+            ai_sessions[session_id] = ai_detective
         
         # Check if already solved
         if ai_detective.is_solved():
@@ -186,7 +185,7 @@ def make_ai_move():
                     'algorithm': 'A* Search + CSP'
                 },
                 'action_taken': None,
-                'algorithm_explanation': ai_detective.algorithm_steps[-5:] if ai_detective.algorithm_steps else []
+                'algorithm_explanation': list(ai_detective.algorithm_steps)[-5:]
             })
         
         # Get best action
@@ -211,7 +210,7 @@ def make_ai_move():
         ai_detective.update_state(evidence, csp_result)
         
         # Get next best action
-        next_action, _, _ = ai_detective.get_best_action()
+        next_action = ai_detective.peek_best_action()
         
         # Update game state reference
         updated_game_state = get_game_state(session_id)
@@ -235,7 +234,7 @@ def make_ai_move():
                 'cost': evidence['cost'],
                 'reasoning': explanation
             },
-            'algorithm_explanation': ai_detective.algorithm_steps[-5:] if ai_detective.algorithm_steps else []
+            'algorithm_explanation': list(ai_detective.algorithm_steps)[-5:]
         })
     except Exception as e:
         import traceback
@@ -250,7 +249,6 @@ def make_ai_move():
 def auto_solve():
     """AI automatically solves the case"""
     try:
-        init_game_imports()
         data = request.json
         session_id = data.get('session_id')
         
@@ -331,7 +329,6 @@ def auto_solve():
 def get_suggestion():
     """Get AI suggestion for next action"""
     try:
-        init_game_imports()
         data = request.json
         session_id = data.get('session_id')
         
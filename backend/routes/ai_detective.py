@@ -1,128 +1,227 @@
 from flask import Blueprint, request, jsonify
 import heapq
+import re
+import sys
 from typing import Dict, List, Tuple
-import copy
+from collections import deque
+from models.session_store import SessionStore
+from routes.game import get_game_state, get_available_actions, apply_action
 
 ai_detective_bp = Blueprint('ai_detective', __name__)
 
-# Store AI state per session
-ai_sessions = {}
+# Store AI state per session (idle sessions expire after an hour)
+ai_sessions = SessionStore(maxsize=10000, ttl=3600)
 
 class AIDetective:
     """AI Detective using A* search and CSP with enhanced heuristics"""
     
+    # Number of ranked evaluations returned by get_best_action
+    MAX_EVALUATIONS = 5
+    
+    # Only the most recent algorithm steps are kept for display
+    MAX_ALGORITHM_STEPS = 50
+    
+    # One instance lives per session, so skip the per-instance __dict__
+    __slots__ = (
+        'values', 'value_index', 'domains', 'solution', 'total_cost',
+        'actions_taken', 'algorithm_steps', 'possible_solutions',
+        '_clue_hits', '_clue_pattern', '_pending',
+        '_available_actions', '_action_costs', '_action_gains',
+        '_solutions_product', '_domain_size_sum', '_unresolved_count'
+    )
+    
     def __init__(self, game_state, available_actions, solution):
-        self.domains = copy.deepcopy(game_state['current_domains'])
-        self.available_actions = copy.deepcopy(available_actions)
+        # Domains are bitmasks over a fixed, per-category tuple of values:
+        # bit i of self.domains[category] is set while self.values[category][i]
+        # is still possible
+        self.values = {}
+        self.value_index = {}
+        self.domains = {}
+        for category, values in game_state['current_domains'].items():
+            self.values[category] = tuple(sys.intern(v) for v in values)
+            self.value_index[category] = {v: i for i, v in enumerate(self.values[category])}
+            self.domains[category] = (1 << len(values)) - 1
+        self._compile_clue_matcher()
+        # Categories that became singletons and still need forward checking
+        self._pending = deque(c for c, mask in self.domains.items() if mask.bit_count() == 1)
+        self.available_actions = available_actions
         self.solution = solution
         self.total_cost = 0
         self.actions_taken = []
+        self.algorithm_steps = deque(maxlen=self.MAX_ALGORITHM_STEPS)
+        
+        # Domain statistics, kept up to date as values are removed
+        self._solutions_product = 1
+        self._domain_size_sum = 0
+        self._unresolved_count = 0
+        for mask in self.domains.values():
+            size = mask.bit_count()
+            self._solutions_product *= size
+            self._domain_size_sum += size
+            if size > 1:
+                self._unresolved_count += 1
         self.possible_solutions = self._count_solutions()
-        self.algorithm_steps = []
+        
+    def _compile_clue_matcher(self):
+        """
+        Build one regex that finds every domain value mentioned in a clue
+        Matches start at each position (lookahead) and prefer the longest
+        value there; _clue_hits maps a matched value to every value it
+        contains, so shorter overlapping values ("garden" in "gardener")
+        are still reported
+        """
+        lowered = {}
+        for category, values in self.values.items():
+            for i, value in enumerate(values):
+                lowered.setdefault(sys.intern(value.lower()), []).append((category, 1 << i))
+        
+        self._clue_hits = {
+            word: [hit for other, hits in lowered.items() if other in word for hit in hits]
+            for word in lowered
+        }
+        alternatives = sorted(lowered, key=len, reverse=True)
+        self._clue_pattern = re.compile('(?=(%s))' % '|'.join(map(re.escape, alternatives)))
+    
+    @property
+    def available_actions(self):
+        """Remaining actions; assigning a new list refreshes the cost/gain columns"""
+        return self._available_actions
+    
+    @available_actions.setter
+    def available_actions(self, actions):
+        # Action dicts are only read, but the list itself is copied so the
+        # cost/gain columns can't fall out of step if the caller mutates it
+        self._available_actions = list(actions)
+        self._action_costs = [action['cost'] for action in self._available_actions]
+        self._action_gains = [self._information_gain(action) for action in self._available_actions]
+    
+    def _value_of(self, category, bit):
+        """Value represented by a single-bit mask in a category"""
+        return self.values[category][bit.bit_length() - 1]
+    
+    def domain_values(self, domains=None):
+        """
+        Domains as {category: [values]} for serialization
+        domains: bitmask snapshot to decode, defaults to the current domains
+        """
+        if domains is None:
+            domains = self.domains
+        return {
+            category: [v for i, v in enumerate(self.values[category]) if mask >> i & 1]
+            for category, mask in domains.items()
+        }
+        
+    def _shrink(self, category, mask):
+        """
+        Narrow a category's domain to mask
+        All domain changes go through here so the statistics stay in step
+        """
+        old_size = self.domains[category].bit_count()
+        new_size = mask.bit_count()
+        self.domains[category] = mask
+        if old_size == new_size:
+            return
+        self._solutions_product = self._solutions_product // old_size * new_size
+        self._domain_size_sum -= old_size - new_size
+        if old_size > 1 and new_size <= 1:
+            self._unresolved_count -= 1
+        if new_size == 1:
+            self._pending.append(category)
         
     def _count_solutions(self):
         """Count possible solutions from current domains"""
-        count = 1
-        for values in self.domains.values():
-            count *= len(values)
-        return count
+        return self._solutions_product
     
-    def _heuristic(self, domains):
+    def _heuristic(self):
         """
         Enhanced heuristic for A* search
         Estimates cost to reach solution from current state
         """
         # H1: Remaining uncertainty (number of possible solutions)
-        solutions_left = 1
-        for values in domains.values():
-            solutions_left *= len(values)
+        solutions_left = self._solutions_product
         
         # H2: Average domain size (prefer smaller domains)
-        avg_domain_size = sum(len(v) for v in domains.values()) / len(domains)
+        avg_domain_size = self._domain_size_sum / len(self.domains)
         
         # H3: Unresolved categories (categories with multiple possibilities)
-        unresolved = sum(1 for v in domains.values() if len(v) > 1)
+        unresolved = self._unresolved_count
         
         # Combined heuristic (weighted)
         h = (solutions_left * 2) + (avg_domain_size * 5) + (unresolved * 10)
         return h
     
-    def _information_gain(self, action, current_domains):
+    def _information_gain(self, action):
         """
         Calculate expected information gain from an action
-        Uses entropy-based approach
+        Depends only on the action, not on the current domains
         """
-        import math
-        
-        # Calculate current entropy
-        current_entropy = 0
-        for values in current_domains.values():
-            if len(values) > 0:
-                p = 1.0 / len(values)
-                current_entropy -= len(values) * p * math.log2(p) if p > 0 else 0
-        
-        # Estimate expected entropy after action
+        # Estimate expected entropy reduction from the action
         # (simplified - assumes action will eliminate some possibilities)
         expected_reduction = len(action.get('eliminates', [])) * 0.5
         
-        # Information gain = current entropy - expected entropy after action
-        info_gain = expected_reduction / (action['cost'] + 1)  # Normalize by cost
+        # Information gain per unit of cost
+        info_gain = expected_reduction / (action['cost'] + 1)
         
         return info_gain
     
+    def _select_best(self):
+        """
+        Score every available action and pick the lowest f-score
+        f(n) = g(n) + h(n) - information_gain_bonus
+        Returns: (best_index, f_scores, h_cost)
+        """
+        # h(n): heuristic estimate to goal, the same for every candidate
+        h_cost = self._heuristic()
+        
+        f_scores = [
+            self.total_cost + cost + h_cost - info_gain * 20
+            for cost, info_gain in zip(self._action_costs, self._action_gains)
+        ]
+        best_index = min(range(len(f_scores)), key=f_scores.__getitem__)
+        return best_index, f_scores, h_cost
+    
+    def peek_best_action(self):
+        """Best next action by f-score, without recording a search step"""
+        if not self.available_actions:
+            return None
+        best_index, _, _ = self._select_best()
+        return self.available_actions[best_index]
+    
     def get_best_action(self):
         """
         Use A* search to find the best next action
-        Returns: (action, explanation, all_evaluations)
+        Returns: (action, explanation, top_evaluations)
+        top_evaluations holds the MAX_EVALUATIONS lowest f-scores, best first
         """
         if not self.available_actions:
             return None, "No actions available", []
         
-        evaluations = []
-        best_action = None
-        best_f_score = float('inf')
+        best_index, f_scores, h_cost = self._select_best()
+        best_action = self.available_actions[best_index]
+        best_f_score = f_scores[best_index]
         
-        for action in self.available_actions:
-            # Simulate taking this action
-            simulated_domains = copy.deepcopy(self.domains)
-            
-            # g(n): actual cost so far + action cost
-            g_cost = self.total_cost + action['cost']
-            
-            # h(n): heuristic estimate to goal
-            h_cost = self._heuristic(simulated_domains)
-            
-            # Information gain bonus
-            info_gain = self._information_gain(action, self.domains)
-            
-            # f(n) = g(n) + h(n) - information_gain_bonus
-            f_cost = g_cost + h_cost - (info_gain * 20)
-            
+        # Only the top few evaluations are reported, so skip the full sort
+        evaluations = []
+        for i in heapq.nsmallest(self.MAX_EVALUATIONS, range(len(f_scores)), key=f_scores.__getitem__):
+            action = self.available_actions[i]
             evaluations.append({
                 'action': action['action'],
                 'action_id': action['id'],
-                'g_cost': g_cost,
+                'g_cost': self.total_cost + action['cost'],
                 'h_cost': h_cost,
-                'info_gain': info_gain,
-                'f_cost': f_cost
+                'info_gain': self._action_gains[i],
+                'f_cost': f_scores[i]
             })
-            
-            if f_cost < best_f_score:
-                best_f_score = f_cost
-                best_action = action
-        
-        # Sort evaluations by f_cost
-        evaluations.sort(key=lambda x: x['f_cost'])
         
         explanation = f"Selected '{best_action['action']}' using A* algorithm. " \
                      f"F-score: {best_f_score:.2f} (Cost: {best_action['cost']}, " \
-                     f"Heuristic: {self._heuristic(self.domains):.2f})"
+                     f"Heuristic: {h_cost:.2f})"
         
         self.algorithm_steps.append({
             'type': 'search',
             'algorithm': 'A* Search',
             'message': explanation,
-            'details': f"Evaluated {len(evaluations)} possible actions"
+            'details': f"Evaluated {len(f_scores)} possible actions"
         })
         
         return best_action, explanation, evaluations
@@ -138,32 +237,41 @@ class AIDetective:
         clue = evidence['clue'].lower()
         
         # Extract constraint information
-        if 'not' in clue or 'wasn\'t' in clue or 'didn\'t' in clue:
-            # Elimination constraint
-            for category in self.domains:
-                for value in list(self.domains[category]):
-                    if value.lower() in clue:
-                        if len(self.domains[category]) > 1:
-                            self.domains[category].remove(value)
-                            steps.append({
-                                'type': 'elimination',
-                                'algorithm': 'CSP - Arc Consistency',
-                                'message': f"Eliminated {value} from {category}",
-                                'details': f"Clue indicated: {clue}"
-                            })
-        else:
-            # Confirmation or implication constraint
-            for category in self.domains:
-                for value in list(self.domains[category]):
-                    if value.lower() in clue:
-                        if len(self.domains[category]) > 1:
-                            self.domains[category] = [value]
-                            steps.append({
-                                'type': 'confirmation',
-                                'algorithm': 'CSP - Domain Reduction',
-                                'message': f"Confirmed {value} as {category}",
-                                'details': f"Clue indicated: {clue}"
-                            })
+        eliminate = 'not' in clue or 'wasn\'t' in clue or 'didn\'t' in clue
+        
+        # Values mentioned in the clue, as a bitmask per category
+        hits = dict.fromkeys(self.domains, 0)
+        for word in {match.group(1) for match in self._clue_pattern.finditer(clue)}:
+            for category, bit in self._clue_hits[word]:
+                hits[category] |= bit
+        
+        for category, mask in self.domains.items():
+            # Only values that are still possible matter
+            hit = hits[category] & mask
+            
+            if eliminate:
+                # Elimination constraint
+                while hit and mask.bit_count() > 1:
+                    bit = hit & -hit
+                    hit &= ~bit
+                    mask &= ~bit
+                    self._shrink(category, mask)
+                    steps.append({
+                        'type': 'elimination',
+                        'algorithm': 'CSP - Arc Consistency',
+                        'message': f"Eliminated {self._value_of(category, bit)} from {category}",
+                        'details': f"Clue indicated: {clue}"
+                    })
+            elif hit and mask.bit_count() > 1:
+                # Confirmation or implication constraint
+                bit = hit & -hit
+                self._shrink(category, bit)
+                steps.append({
+                    'type': 'confirmation',
+                    'algorithm': 'CSP - Domain Reduction',
+                    'message': f"Confirmed {self._value_of(category, bit)} as {category}",
+                    'details': f"Clue indicated: {clue}"
+                })
         
         # Forward checking - check if this creates new constraints
         self._forward_check(steps)
@@ -174,33 +282,36 @@ class AIDetective:
     def _forward_check(self, steps):
         """
         Forward checking to propagate constraints
+        Only categories that became solved since the last check are visited
         """
-        # Check if any domain is solved (has one value)
-        for category, values in self.domains.items():
-            if len(values) == 1:
-                solved_value = values[0]
-                # Remove this value from other categories if applicable
-                for other_cat, other_vals in self.domains.items():
-                    if other_cat != category and solved_value in other_vals and len(other_vals) > 1:
-                        other_vals.remove(solved_value)
-                        steps.append({
-                            'type': 'elimination',
-                            'algorithm': 'CSP - Forward Checking',
-                            'message': f"Eliminated {solved_value} from {other_cat} (already assigned to {category})",
-                            'details': 'Constraint propagation'
-                        })
+        while self._pending:
+            category = self._pending.popleft()
+            solved_value = self._value_of(category, self.domains[category])
+            # Remove this value from other categories if applicable
+            for other_cat, other_mask in self.domains.items():
+                i = self.value_index[other_cat].get(solved_value)
+                if other_cat == category or i is None:
+                    continue
+                if other_mask >> i & 1 and other_mask.bit_count() > 1:
+                    self._shrink(other_cat, other_mask & ~(1 << i))
+                    steps.append({
+                        'type': 'elimination',
+                        'algorithm': 'CSP - Forward Checking',
+                        'message': f"Eliminated {solved_value} from {other_cat} (already assigned to {category})",
+                        'details': 'Constraint propagation'
+                    })
     
     def is_solved(self):
         """Check if the case is solved"""
-        return all(len(values) == 1 for values in self.domains.values())
+        return self._solutions_product == 1
     
     def get_solution(self):
         """Get the current solution"""
         if self.is_solved():
             return {
-                'suspect': self.domains['suspect'][0],
-                'weapon': self.domains['weapon'][0],
-                'location': self.domains['location'][0]
+                'suspect': self._value_of('suspect', self.domains['suspect']),
+                'weapon': self._value_of('weapon', self.domains['weapon']),
+                'location': self._value_of('location', self.domains['location'])
             }
         return None
 
@@ -211,9 +322,6 @@ def make_ai_move():
         data = request.json
         session_id = data.get('session_id')
         
-        # Import game state (you'll need to adapt this to your game management)
-        from routes.game import get_game_state, apply_action
-        
         game_state = get_game_state(session_id)
         if not game_state:
             return jsonify({
@@ -222,14 +330,14 @@ def make_ai_move():
             })
         
         # Initialize or get AI detective for this session
-        if session_id not in ai_sessions:
-            ai_sessions[session_id] = AIDetective(
+        ai_detective = ai_sessions.get(session_id)
+        if ai_detective is None:
+            ai_detective = AIDetective(
                 game_state,
-                game_state.get('available_actions', []),
+                get_available_actions(game_state),
                 game_state.get('solution')
             )
-        
-        ai_detective = ai_sessions[session_id]
+            ai_sessions[session_id] = ai_detective
         
         # Check if already solved
         if ai_detective.is_solved():
@@ -241,12 +349,12 @@ def make_ai_move():
                     'total_cost': ai_detective.total_cost,
                     'actions_taken': len(ai_detective.actions_taken),
                     'possible_solutions': 1,
-                    'current_domains': ai_detective.domains,
+                    'current_domains': ai_detective.domain_values(),
                     'confidence': 1.0,
                     'algorithm': 'A* Search + CSP'
                 },
                 'action_taken': None,
-                'algorithm_explanation': ai_detective.algorithm_steps
+                'algorithm_explanation': list(ai_detective.algorithm_steps)
             })
         
         # Get best action using A*
@@ -272,13 +380,13 @@ def make_ai_move():
             
             # Update available actions
             updated_game_state = get_game_state(session_id)
-            ai_detective.available_actions = updated_game_state.get('available_actions', [])
+            ai_detective.available_actions = get_available_actions(updated_game_state)
             
             # Calculate confidence
             confidence = 1.0 - (ai_detective.possible_solutions / 27.0)
             
             # Get next best action for display
-            next_action, _, _ = ai_detective.get_best_action()
+            next_action = ai_detective.peek_best_action()
             
             return jsonify({
                 'success': True,
@@ -288,7 +396,7 @@ def make_ai_move():
                     'total_cost': ai_detective.total_cost,
                     'actions_taken': len(ai_detective.actions_taken),
                     'possible_solutions': ai_detective.possible_solutions,
-                    'current_domains': ai_detective.domains,
+                    'current_domains': ai_detective.domain_values(),
                     'confidence': confidence,
                     'algorithm': 'A* Search + CSP',
                     'next_best_action': next_action['action'] if next_action else None
@@ -299,7 +407,7 @@ def make_ai_move():
                     'cost': evidence['cost'],
                     'reasoning': explanation
                 },
-                'algorithm_explanation': ai_detective.algorithm_steps[-5:]  # Last 5 steps
+                'algorithm_explanation': list(ai_detective.algorithm_steps)[-5:]  # Last 5 steps
             })
         
         return jsonify({
@@ -320,8 +428,6 @@ def auto_solve():
         data = request.json
         session_id = data.get('session_id')
         
-        from routes.game import get_game_state, apply_action
-        
         game_state = get_game_state(session_id)
         if not game_state:
             return jsonify({
@@ -332,7 +438,7 @@ def auto_solve():
         # Initialize AI detective
         ai_detective = AIDetective(
             game_state,
-            game_state.get('available_actions', []),
+            get_available_actions(game_state),
             game_state.get('solution')
         )
         
@@ -365,13 +471,18 @@ def auto_solve():
                     'clue': evidence['clue'],
                     'cost': evidence['cost'],
                     'reasoning': explanation,
-                    'domains_after': copy.deepcopy(ai_detective.domains),
+                    # Masks are ints, so a shallow copy is a full snapshot
+                    'domains_after': dict(ai_detective.domains),
                     'csp_steps': csp_steps
                 })
                 
                 # Update available actions
                 updated_game_state = get_game_state(session_id)
-                ai_detective.available_actions = updated_game_state.get('available_actions', [])
+                ai_detective.available_actions = get_available_actions(updated_game_state)
+        
+        # Decode the mask snapshots into value lists for the response
+        for entry in solution_path:
+            entry['domains_after'] = ai_detective.domain_values(entry['domains_after'])
         
         return jsonify({
             'success': True,
@@ -380,7 +491,7 @@ def auto_solve():
             'steps_taken': len(ai_detective.actions_taken),
             'total_cost': ai_detective.total_cost,
             'solution_path': solution_path,
-            'final_domains': ai_detective.domains
+            'final_domains': ai_detective.domain_values()
         })
         
     except Exception as e:
@@ -396,8 +507,7 @@ def reset_ai():
         data = request.json
         session_id = data.get('session_id')
         
-        if session_id in ai_sessions:
-            del ai_sessions[session_id]
+        ai_sessions.pop(session_id, None)
         
         return jsonify({
             'success': True,
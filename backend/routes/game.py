@@ -1,11 +1,12 @@
 from flask import Blueprint, request, jsonify
 import random
 from algorithms.csp_solver import CSPSolver
+from models.session_store import SessionStore
 
 game_bp = Blueprint('game', __name__)
 
-# Global game sessions storage
-game_sessions = {}
+# Global game sessions storage (idle sessions expire after an hour)
+game_sessions = SessionStore(maxsize=10000, ttl=3600)
 
 # Game data
 SUSPECTS = ["Butler", "Chef", "Gardener"]
@@ -110,10 +111,11 @@ def initialize_game(session_id):
             "weapon": WEAPONS.copy(),
             "location": LOCATIONS.copy()
         },
-        "available_actions": [
-            {**evidence, "clue": clues[evidence["id"]]} 
+        # Remaining actions keyed by id, in their original order
+        "available_actions_by_id": {
+            evidence["id"]: {**evidence, "clue": clues[evidence["id"]]}
             for evidence in EVIDENCE_LIST
-        ],
+        },
         "actions_taken": [],
         "total_cost": 0,
         "constraints": [],
@@ -128,28 +130,27 @@ def get_game_state(session_id):
     """Get current game state"""
     return game_sessions.get(session_id)
 
+def get_available_actions(game_state):
+    """Remaining actions of a game as a list, in their original order"""
+    return list(game_state['available_actions_by_id'].values())
+
 def apply_action(session_id, evidence_id):
     """Apply an action and return evidence"""
     game_state = get_game_state(session_id)
     if not game_state:
         return None
     
-    # Find the evidence
-    evidence = None
-    for action in game_state['available_actions']:
-        if action['id'] == evidence_id:
-            evidence = action
-            break
+    # Find the evidence and remove it from available actions
+    actions_by_id = game_state['available_actions_by_id']
+    try:
+        evidence = actions_by_id.pop(evidence_id, None)
+    except TypeError:
+        # Unhashable ids from malformed requests can't match any action
+        return None
     
     if not evidence:
         return None
     
-    # Remove from available actions
-    game_state['available_actions'] = [
-        a for a in game_state['available_actions'] 
-        if a['id'] != evidence_id
-    ]
-    
     # Add to taken actions
     game_state['actions_taken'].append(evidence)
     game_state['total_cost'] += evidence['cost']
@@ -374,7 +375,7 @@ def start_game():
                     'action': action['action'],
                     'cost': action['cost']
                 }
-                for action in game_state['available_actions']
+                for action in game_state['available_actions_by_id'].values()
             ]
         })
     except Exception as e:
@@ -430,7 +431,7 @@ def take_action():
                     'action': action['action'],
                     'cost': action['cost']
                 }
-                for action in game_state['available_actions']
+                for action in game_state['available_actions_by_id'].values()
             ]
         })
     except Exception as e: